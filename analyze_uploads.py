@@ -5,15 +5,19 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import re
+
+import pandas as pd
+
 from src.parser import parse_ris_file, entries_to_df
 from src.comparator import compare_datasets, normalize_title_for_key
 
-# Parse both files
+# Parse both files, streaming lines straight from the open handles
 with open('uploads/My Best Screening.ris', 'r', encoding='utf-8') as f:
-    entries_a = parse_ris_file(f.read())
+    entries_a = parse_ris_file(f)
 
 with open('uploads/Google Scholar - automated.ris', 'r', encoding='utf-8') as f:
-    entries_b = parse_ris_file(f.read())
+    entries_b = parse_ris_file(f)
 
 df_a = entries_to_df(entries_a)
 df_b = entries_to_df(entries_b)
@@ -24,18 +28,30 @@ print("="*80)
 print(f"\nFile A (My Best Screening.ris): {len(df_a)} entries")
 print(f"File B (Google Scholar - automated.ris): {len(df_b)} entries")
 
+def lower_titles(df):
+    """Lowercased title column (empty string when missing), computed in pandas."""
+    if 'title' not in df.columns:
+        return pd.Series('', index=df.index)
+    return df['title'].fillna('').astype(str).str.lower()
+
+
+# Lowercase titles once and reuse them for every filter below; kept out of
+# the frames so the helper column never reaches the comparison records
+lc_a = lower_titles(df_a)
+lc_b = lower_titles(df_b)
+
 # Search for papers with "artificial" in the title
-ai_papers_a = [r for r in df_a.to_dict('records') if 'artificial' in str(r.get('title', '')).lower()]
-ai_papers_b = [r for r in df_b.to_dict('records') if 'artificial' in str(r.get('title', '')).lower()]
+ai_papers_a = df_a[lc_a.str.contains('artificial', regex=False)]
+ai_papers_b = df_b[lc_b.str.contains('artificial', regex=False)]
 
 print(f"\nPapers with 'artificial' in File A: {len(ai_papers_a)}")
-for p in ai_papers_a[:3]:
+for _, p in ai_papers_a.head(3).iterrows():
     title = p.get('title', 'N/A')
     year = p.get('year', 'N/A')
     print(f"  - {title[:70]}... (Year: {year})")
 
 print(f"\nPapers with 'artificial' in File B: {len(ai_papers_b)}")
-for p in ai_papers_b[:3]:
+for _, p in ai_papers_b.head(3).iterrows():
     title = p.get('title', 'N/A')
     year = p.get('year', 'N/A')
     print(f"  - {title[:70]}... (Year: {year})")
@@ -43,31 +59,24 @@ for p in ai_papers_b[:3]:
 # Look specifically for the "Using Artificial Intelligence..." paper
 target_keywords = ["using", "artificial", "intelligence", "automated", "risk", "bias"]
 
+# One lookahead per keyword, all anchored at the start: a single regex pass
+# per title that stops at the first missing keyword
+TARGET_RE = re.compile(r'\A' + ''.join(f'(?=.*{re.escape(kw)})' for kw in target_keywords), re.DOTALL)
+
 print(f"\n" + "="*80)
 print("SEARCHING FOR TARGET PAPER")
 print("="*80)
 
-for idx, row in df_a.iterrows():
-    title = str(row.get('title', '')).lower()
-    if all(kw in title for kw in target_keywords):
-        print(f"\nFOUND IN FILE A:")
-        print(f"  Title: {row.get('title', 'N/A')}")
-        print(f"  Year: {row.get('year', 'N/A')}")
-        print(f"  Normalized: {normalize_title_for_key(row.get('title', ''))[:70]}...")
-        break
-else:
-    print("\nNOT FOUND IN FILE A")
-
-for idx, row in df_b.iterrows():
-    title = str(row.get('title', '')).lower()
-    if all(kw in title for kw in target_keywords):
-        print(f"\nFOUND IN FILE B:")
-        print(f"  Title: {row.get('title', 'N/A')}")
-        print(f"  Year: {row.get('year', 'N/A')}")
-        print(f"  Normalized: {normalize_title_for_key(row.get('title', ''))[:70]}...")
-        break
-else:
-    print("\nNOT FOUND IN FILE B")
+for label, df, lc in (('A', df_a, lc_a), ('B', df_b, lc_b)):
+    hits = df[lc.str.contains(TARGET_RE)]
+    if hits.empty:
+        print(f"\nNOT FOUND IN FILE {label}")
+        continue
+    row = hits.iloc[0]
+    print(f"\nFOUND IN FILE {label}:")
+    print(f"  Title: {row.get('title', 'N/A')}")
+    print(f"  Year: {row.get('year', 'N/A')}")
+    print(f"  Normalized: {normalize_title_for_key(row.get('title', ''))[:70]}...")
 
 # Run full comparison
 print(f"\n" + "="*80)
@@ -84,19 +93,19 @@ print(f"  Unique to B: {len(unique_b)}")
 # Check if target paper is in overlap
 for item in overlap:
     title = str(item.get('title', '')).lower()
-    if all(kw in title for kw in target_keywords):
+    if TARGET_RE.search(title):
         print(f"\n✅ TARGET PAPER IS IN OVERLAP!")
         break
 else:
     # Check if it's in unique sets
     for item in unique_a:
         title = str(item.get('title', '')).lower()
-        if all(kw in title for kw in target_keywords):
+        if TARGET_RE.search(title):
             print(f"\n❌ TARGET PAPER IS IN UNIQUE_A (should be in overlap!)")
             break
     
     for item in unique_b:
         title = str(item.get('title', '')).lower()
-        if all(kw in title for kw in target_keywords):
+        if TARGET_RE.search(title):
             print(f"\n❌ TARGET PAPER IS IN UNIQUE_B (should be in overlap!)")
             break
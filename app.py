@@ -1,10 +1,13 @@
 from flask import Flask, render_template, request, redirect, url_for, Response, session
 from src.parser import parse_ris_file, entries_to_df
 from src.analyzer import analyze_references
-from src.comparator import compare_datasets
-from src.deduplicator import deduplicate_multiple_files, get_deduplication_stats
-from src.exporter import export_to_ris_string
+from src.exporter import export_to_ris_iter
 from src.search_engine import search_references
+from src.cache import (
+    load_df_cached, save_result, load_result
+)
+from tasks import run_compare, run_dedup
+import hashlib
 import os
 import uuid
 
@@ -25,10 +28,11 @@ def analyze():
         return redirect(url_for('index'))
 
     if file:
-        entries = parse_ris_file(file.stream.read())
+        entries = parse_ris_file(file.stream)
         df = entries_to_df(entries)
         stats = analyze_references(df)
-        records = df.to_dict('records') if not df.empty else []
+        # Read-only rows for the template; avoids a dict per record
+        records = list(df.itertuples(index=False, name='Ref')) if not df.empty else []
     return render_template('analyze.html', stats=stats, records=records, filename=file.filename)
 
 
@@ -38,6 +42,47 @@ if not os.path.exists(UPLOAD_FOLDER):
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
+
+def upload_path(file_id):
+    """
+    Path in the upload folder for an upload id.
+    
+    Uploads are stored by content hash, so the same file always maps to the
+    same path no matter what it was called.
+    """
+    return os.path.join(app.config['UPLOAD_FOLDER'], f"{file_id}.ris")
+
+
+def save_upload(file):
+    """
+    Stream an uploaded file to disk in 1 MiB chunks, addressed by its content.
+    
+    The file is hashed while it is written to a temp file. If an upload with
+    the same content already exists, the temp file is discarded and the
+    existing file (and its cached parse) is reused.
+    
+    Returns:
+        (file_id, path) of the stored upload
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    tmp_path = os.path.join(app.config['UPLOAD_FOLDER'], f".{uuid.uuid4().hex}.tmp")
+    
+    with open(tmp_path, 'wb') as dst:
+        for chunk in iter(lambda: file.stream.read(1 << 20), b''):
+            hasher.update(chunk)
+            dst.write(chunk)
+    
+    file_id = hasher.hexdigest()
+    path = upload_path(file_id)
+    
+    if os.path.exists(path):
+        # Keep the existing file untouched so its mtime-keyed caches stay valid
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, path)
+    
+    return file_id, path
+
 @app.route('/compare', methods=['POST'])
 def compare():
     if 'file_a' not in request.files or 'file_b' not in request.files:
@@ -50,89 +95,96 @@ def compare():
         return redirect(url_for('index'))
 
     # Save files for export functionality
-    path_a = os.path.join(app.config['UPLOAD_FOLDER'], file_a.filename)
-    path_b = os.path.join(app.config['UPLOAD_FOLDER'], file_b.filename)
+    _, path_a = save_upload(file_a)
+    _, path_b = save_upload(file_b)
     
-    file_a.save(path_a)
-    file_b.save(path_b)
+    # Parse and compare in the background; the status page polls for the result
+    job_id = run_compare(app.config['UPLOAD_FOLDER'], path_a, path_b,
+                         file_a.filename, file_b.filename)
+    session['compare_result_id'] = job_id
+
+    return redirect(url_for('status', job_id=job_id))
+
+
+@app.route('/status/<job_id>')
+def status(job_id):
+    """
+    Poll a background compare/deduplicate job and render its results when ready.
+    """
+    result = load_result(app.config['UPLOAD_FOLDER'], job_id)
     
-    # Read back for parsing
-    with open(path_a, 'r', encoding='utf-8', errors='ignore') as f:
-        entries_a = parse_ris_file(f.read())
-        
-    with open(path_b, 'r', encoding='utf-8', errors='ignore') as f:
-        entries_b = parse_ris_file(f.read())
+    if result is None:
+        return "Results expired or missing. Please re-upload.", 404
     
-    df_a = entries_to_df(entries_a)
-    df_b = entries_to_df(entries_b)
+    kind = result.get('kind')
     
-    overlap, unique_a, unique_b = compare_datasets(df_a, df_b)
+    if kind == 'pending':
+        return render_template('status.html', job_id=job_id)
     
-    stats = {
-        "overlap_count": len(overlap),
-        "unique_a_count": len(unique_a),
-        "unique_b_count": len(unique_b),
-        "total_a": len(df_a),
-        "total_b": len(df_b)
-    }
-
-    return render_template('compare.html', 
-                           overlap=overlap, 
-                           unique_a=unique_a, 
-                           unique_b=unique_b, 
-                           stats=stats,
-                           filename_a=file_a.filename,
-                           filename_b=file_b.filename)
+    if kind == 'failed':
+        return "Processing failed. Please check your files and re-upload.", 500
+    
+    if kind == 'compare':
+        return render_template('compare.html', 
+                               overlap=result['overlap'], 
+                               unique_a=result['unique_a'], 
+                               unique_b=result['unique_b'], 
+                               stats=result['stats'],
+                               filename_a=result['filename_a'],
+                               filename_b=result['filename_b'],
+                               result_id=job_id)
+    
+    if kind != 'dedup':
+        return "Results expired or missing. Please re-upload.", 404
+    
+    if result['empty']:
+        return redirect(url_for('index'))
+    
+    return render_template(
+        'deduplicate.html',
+        unique_refs=result['unique_refs'],
+        duplicates=result['duplicates'],
+        stats=result['stats'],
+        filenames=result['filenames'],
+        result_id=job_id
+    )
 
 @app.route('/export_ris')
 def export_ris():
-    from src.exporter import export_to_ris_string
-    from flask import Response
-
-    filename_a = request.args.get('filename_a')
-    filename_b = request.args.get('filename_b')
+    result_id = request.args.get('result_id') or session.get('compare_result_id')
     subset = request.args.get('subset') # 'overlap', 'unique_a', 'unique_b'
     
-    if not filename_a or not filename_b or not subset:
+    if not result_id or not subset:
         return "Missing arguments", 400
         
-    path_a = os.path.join(app.config['UPLOAD_FOLDER'], filename_a)
-    path_b = os.path.join(app.config['UPLOAD_FOLDER'], filename_b)
+    # Load the stored comparison instead of re-parsing both files
+    result = load_result(app.config['UPLOAD_FOLDER'], result_id)
     
-    if not os.path.exists(path_a) or not os.path.exists(path_b):
+    if result is None or result.get('kind') != 'compare':
         return "Files expired or missing. Please re-upload.", 404
-        
-    # Re-process to get the subset
-    with open(path_a, 'r', encoding='utf-8', errors='ignore') as f:
-        entries_a = parse_ris_file(f.read())
-    with open(path_b, 'r', encoding='utf-8', errors='ignore') as f:
-        entries_b = parse_ris_file(f.read())
-        
-    df_a = entries_to_df(entries_a)
-    df_b = entries_to_df(entries_b)
     
-    overlap, unique_a, unique_b = compare_datasets(df_a, df_b)
+    filename_a = result['filename_a']
+    filename_b = result['filename_b']
     
     target_data = []
     export_filename = "export.ris"
     
     if subset == 'unique_a':
-        target_data = unique_a
+        target_data = result['unique_a']
         export_filename = f"unique_to_{filename_a}"
     elif subset == 'unique_b':
-        target_data = unique_b
+        target_data = result['unique_b']
         export_filename = f"unique_to_{filename_b}"
     elif subset == 'overlap':
-        target_data = overlap
+        target_data = result['overlap']
         export_filename = f"overlap_{filename_a}_{filename_b}.ris"
         
     if not export_filename.endswith('.ris'):
         export_filename += '.ris'
         
-    ris_content = export_to_ris_string(target_data)
-    
+    # Stream one record at a time instead of building the whole file
     return Response(
-        ris_content,
+        export_to_ris_iter(target_data),
         mimetype="application/x-research-info-systems",
         headers={"Content-Disposition": f"attachment;filename={export_filename}"}
     )
@@ -150,43 +202,21 @@ def deduplicate():
     if not files or all(f.filename == '' for f in files):
         return redirect(url_for('index'))
     
-    # Parse all files
-    file_data_list = []
-    filenames = []
+    # Save all files
+    named_paths = []
     
     for file in files:
         if file.filename == '':
             continue
             
         # Save file for potential re-export
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-        file.save(filepath)
-        
-        # Parse file
-        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-            entries = parse_ris_file(f.read())
-            df = entries_to_df(entries)
-            
-        if not df.empty:
-            file_data_list.append((file.filename, df))
-            filenames.append(file.filename)
+        _, filepath = save_upload(file)
+        named_paths.append((file.filename, filepath))
     
-    if not file_data_list:
-        return redirect(url_for('index'))
-    
-    # Perform deduplication
-    unique_refs, duplicates = deduplicate_multiple_files(file_data_list)
+    # Parse and deduplicate in the background; the status page polls for the result
+    job_id = run_dedup(app.config['UPLOAD_FOLDER'], named_paths)
     
-    # Calculate statistics
-    stats = get_deduplication_stats(unique_refs, duplicates, file_data_list)
-    
-    return render_template(
-        'deduplicate.html',
-        unique_refs=unique_refs,
-        duplicates=duplicates,
-        stats=stats,
-        filenames=filenames
-    )
+    return redirect(url_for('status', job_id=job_id))
 
 
 @app.route('/export_dedup/<table_type>', methods=['POST'])
@@ -197,53 +227,24 @@ def export_dedup(table_type):
     Args:
         table_type: 'unique' or 'duplicates'
     """
-    # Re-process files from uploads folder
-    filenames = request.form.getlist('filenames')
-    
-    if not filenames:
-        return redirect(url_for('index'))
-    
-    # Reload and re-deduplicate
-    file_data_list = []
-    for filename in filenames:
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        
-        if not os.path.exists(filepath):
-            continue
-            
-        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-            entries = parse_ris_file(f.read())
-            df = entries_to_df(entries)
-            
-        if not df.empty:
-            file_data_list.append((filename, df))
+    # Load the stored deduplication instead of re-parsing the uploads
+    result = load_result(app.config['UPLOAD_FOLDER'], request.form.get('result_id'))
     
-    unique_refs, duplicates = deduplicate_multiple_files(file_data_list)
+    if result is None or result.get('kind') != 'dedup' or result['empty']:
+        return "Results expired or missing. Please re-upload.", 404
     
     # Select export data based on type
     if table_type == 'unique':
-        export_data = unique_refs
+        export_data = result['unique_refs']
         export_filename = 'unique_references.ris'
     else:  # duplicates
-        export_data = duplicates
+        export_data = result['duplicates']
         export_filename = 'removed_duplicates.ris'
     
-    # Clean up metadata fields before export
-    clean_data = []
-    for ref in export_data:
-        clean_ref = ref.copy()
-        # Remove deduplication metadata
-        clean_ref.pop('source_file', None)
-        clean_ref.pop('appears_in', None)
-        clean_ref.pop('occurrence_count', None)
-        clean_ref.pop('duplicate_of', None)
-        clean_ref.pop('all_sources', None)
-        clean_data.append(clean_ref)
-    
-    ris_content = export_to_ris_string(clean_data)
-    
+    # Deduplication metadata needs no clean-up: the exporter only writes RIS fields
+    # Stream one record at a time instead of building the whole file
     return Response(
-        ris_content,
+        export_to_ris_iter(export_data),
         mimetype="application/x-research-info-systems",
         headers={"Content-Disposition": f"attachment;filename={export_filename}"}
     )
@@ -268,27 +269,28 @@ def search():
     if not fields:
         fields = ['title', 'abstract']  # Default fields
     
-    # Generate unique ID for this search session
-    search_id = str(uuid.uuid4())
-    
     # Save file for re-querying
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"search_{search_id}_{file.filename}")
-    file.save(filepath)
-    
-    # Parse RIS file
-    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-        entries = parse_ris_file(f.read())
+    _, filepath = save_upload(file)
     
-    df = entries_to_df(entries)
+    # Parse RIS file (cached for re-querying and export)
+    df = load_df_cached(filepath)
     
     # Execute search
     matched_refs, unmatched_refs, stats = search_references(df, query, fields)
     
     # Store in session for re-querying
-    session['search_file_id'] = search_id
     session['search_filename'] = file.filename
     session['search_filepath'] = filepath
     
+    # Store results so exports can slice them without re-searching
+    result_id = save_result(app.config['UPLOAD_FOLDER'], {
+        'kind': 'search',
+        'matched': matched_refs,
+        'unmatched': unmatched_refs,
+        'filename': file.filename
+    })
+    session['search_result_id'] = result_id
+    
     return render_template(
         'search.html',
         matched_refs=matched_refs,
@@ -296,7 +298,8 @@ def search():
         stats=stats,
         query=query,
         fields=fields,
-        filename=file.filename
+        filename=file.filename,
+        result_id=result_id
     )
 
 
@@ -322,15 +325,20 @@ def search_requery():
     if not fields:
         fields = ['title', 'abstract']
     
-    # Re-parse file (could be optimized with caching)
-    with open(search_filepath, 'r', encoding='utf-8', errors='ignore') as f:
-        entries = parse_ris_file(f.read())
-    
-    df = entries_to_df(entries)
+    # Load cached parse of the file
+    df = load_df_cached(search_filepath)
     
     # Execute new search
     matched_refs, unmatched_refs, stats = search_references(df, query, fields)
     
+    result_id = save_result(app.config['UPLOAD_FOLDER'], {
+        'kind': 'search',
+        'matched': matched_refs,
+        'unmatched': unmatched_refs,
+        'filename': search_filename
+    })
+    session['search_result_id'] = result_id
+    
     return render_template(
         'search.html',
         matched_refs=matched_refs,
@@ -338,7 +346,8 @@ def search_requery():
         stats=stats,
         query=query,
         fields=fields,
-        filename=search_filename
+        filename=search_filename,
+        result_id=result_id
     )
 
 
@@ -348,57 +357,38 @@ def export_search():
     Export search results (matched or unmatched references) as RIS.
     """
     subset = request.args.get('subset')  # 'matched' or 'unmatched'
-    query = request.args.get('query', '')
-    fields_str = request.args.get('fields', 'title,abstract')
-    fields = fields_str.split(',') if fields_str else ['title', 'abstract']
+    result_id = request.args.get('result_id') or session.get('search_result_id')
     
-    # Get cached file from session
-    search_filepath = session.get('search_filepath')
-    search_filename = session.get('search_filename', 'export.ris')
+    # Load the stored search results instead of re-running the search
+    result = load_result(app.config['UPLOAD_FOLDER'], result_id)
     
-    if not search_filepath or not os.path.exists(search_filepath):
+    if result is None or result.get('kind') != 'search':
         return "Session expired. Please re-upload your file.", 404
     
-    # Re-execute search
-    with open(search_filepath, 'r', encoding='utf-8', errors='ignore') as f:
-        entries = parse_ris_file(f.read())
-    
-    df = entries_to_df(entries)
-    matched_refs, unmatched_refs, stats = search_references(df, query, fields)
+    search_filename = result['filename'] or 'export.ris'
     
     # Select export data
     if subset == 'matched':
-        export_data = matched_refs
+        export_data = result['matched']
         export_filename = f"matched_{search_filename}"
     else:
-        export_data = unmatched_refs
+        export_data = result['unmatched']
         export_filename = f"unmatched_{search_filename}"
     
-    # Clean up search-specific metadata
-    clean_data = []
-    for ref in export_data:
-        clean_ref = ref.copy()
-        clean_ref.pop('title_highlighted', None)
-        clean_ref.pop('ti_highlighted', None)
-        clean_ref.pop('abstract_highlighted', None)
-        clean_ref.pop('ab_highlighted', None)
-        clean_ref.pop('n2_highlighted', None)
-        clean_ref.pop('matched_terms', None)
-        clean_ref.pop('match_count', None)
-        clean_data.append(clean_ref)
-    
     if not export_filename.endswith('.ris'):
         export_filename += '.ris'
     
-    ris_content = export_to_ris_string(clean_data)
-    
+    # Search metadata needs no clean-up: the exporter only writes RIS fields
+    # Stream one record at a time instead of building the whole file
     return Response(
-        ris_content,
+        export_to_ris_iter(export_data),
         mimetype="application/x-research-info-systems",
         headers={"Content-Disposition": f"attachment;filename={export_filename}"}
     )
 
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
+    # Development server only; production runs under gunicorn via wsgi.py.
+    # The debugger and reloader are opt-in with FLASK_DEV=1.
+    app.run(debug=bool(os.environ.get('FLASK_DEV')), port=5000)
 
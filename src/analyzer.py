@@ -52,7 +52,8 @@ def analyze_references(df):
     
     top_journals = {}
     if journal_col:
-        top_journals = df[journal_col].value_counts().head(10).to_dict()
+        # Count as plain objects so ties keep first-seen order for category columns
+        top_journals = df[journal_col].astype(object).value_counts().head(10).to_dict()
 
     return {
         "total_references": total_references,
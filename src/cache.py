@@ -0,0 +1,252 @@
+"""
+Parse and result cache for uploaded RIS files.
+
+Export and re-query routes used to re-read, re-parse and re-compare the
+same uploads on every click. This module keeps a pickled sidecar DataFrame
+per uploaded file (re-parsed when the upload is newer).
+
+Compare, deduplicate and search results are stored on disk under an id so
+the export routes can slice them without recomputing anything.
+"""
+
+import multiprocessing
+import os
+import pickle
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from src.parser import parse_ris_path, entries_to_df
+from src.comparator import compare_datasets
+from src.deduplicator import deduplicate_multiple_files
+
+
+CACHE_DIR_NAME = '.cache'
+
+
+def _cache_file_for(path):
+    """
+    Return the sidecar pickle path that caches the parsed DataFrame of `path`.
+
+    There is one sidecar per upload, so re-uploading a file replaces its
+    cache entry instead of leaving stale ones behind.
+    """
+    cache_dir = os.path.join(os.path.dirname(path), CACHE_DIR_NAME)
+    os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, f"{os.path.basename(path)}.pkl")
+
+
+def _is_fresh(cache_file, path):
+    """
+    True if `cache_file` exists and was written after `path` was last modified.
+    """
+    try:
+        return os.stat(cache_file).st_mtime_ns >= os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def load_df_cached(path):
+    """
+    Load a saved RIS file as a DataFrame, parsing it only once.
+
+    Args:
+        path: Path to a saved RIS file
+
+    Returns:
+        DataFrame of parsed references
+    """
+    cache_file = _cache_file_for(path)
+    if _is_fresh(cache_file, path):
+        return pd.read_pickle(cache_file)
+
+    df = entries_to_df(parse_ris_path(path))
+
+    # Write then rename so concurrent readers never see a partial pickle
+    tmp_file = f"{cache_file}.{uuid.uuid4().hex}.tmp"
+    df.to_pickle(tmp_file)
+    os.replace(tmp_file, cache_file)
+    return df
+
+
+def _write_sidecar(path):
+    """
+    Parse `path` into its sidecar pickle in a worker process.
+
+    Returns nothing, so the DataFrame is not pickled back to the parent;
+    the parent reads the sidecar instead.
+    """
+    load_df_cached(path)
+
+
+def load_dfs_cached(paths):
+    """
+    Load several saved RIS files, parsing uncached ones in parallel.
+
+    Parsing is CPU-bound Python, so files without a cache entry are parsed
+    in worker processes when there is more than one of them. Workers are
+    spawned rather than forked, since the web process runs threads.
+
+    Args:
+        paths: List of paths to saved RIS files
+
+    Returns:
+        List of DataFrames in the same order as `paths`
+    """
+    pending = [path for path in dict.fromkeys(paths)
+               if not _is_fresh(_cache_file_for(path), path)]
+
+    if len(pending) > 1:
+        max_workers = min(len(pending), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            list(executor.map(_write_sidecar, pending))
+
+    # Sidecars are fresh now, so this only reads the pickles
+    return [load_df_cached(path) for path in paths]
+
+
+def get_comparison(path_a, path_b):
+    """
+    Compare two saved RIS files, reading their cached parses.
+
+    Returns:
+        (overlap, unique_a, unique_b, stats)
+    """
+    df_a = load_df_cached(path_a)
+    df_b = load_df_cached(path_b)
+    overlap, unique_a, unique_b = compare_datasets(df_a, df_b)
+
+    stats = {
+        "overlap_count": len(overlap),
+        "unique_a_count": len(unique_a),
+        "unique_b_count": len(unique_b),
+        "total_a": len(df_a),
+        "total_b": len(df_b)
+    }
+    return overlap, unique_a, unique_b, stats
+
+
+def deduplicate_files_cached(named_paths):
+    """
+    Deduplicate saved RIS files, reading their cached parses.
+
+    Args:
+        named_paths: List of (display filename, path) tuples
+
+    Returns:
+        (unique_refs, duplicates, file_data_list)
+    """
+    file_data_list = []
+    dfs = load_dfs_cached([path for _, path in named_paths])
+    for (filename, _), df in zip(named_paths, dfs):
+        if not df.empty:
+            file_data_list.append((filename, df))
+
+    unique_refs, duplicates = deduplicate_multiple_files(file_data_list)
+    return unique_refs, duplicates, file_data_list
+
+
+RESULTS_DIR_NAME = '.results'
+RESULT_MAX_AGE_SECONDS = 60 * 60
+# Markers of jobs that never finished (e.g. their worker was restarted)
+PENDING_MAX_AGE_SECONDS = 24 * 60 * 60
+PENDING_SUFFIX = '.pending'
+
+
+def _result_path(upload_folder, result_id, suffix='.pkl'):
+    # Only accept ids we generated ourselves to avoid path traversal
+    result_id = str(uuid.UUID(result_id))
+    return os.path.join(upload_folder, RESULTS_DIR_NAME, f"{result_id}{suffix}")
+
+
+def sweep_results(upload_folder, max_age=RESULT_MAX_AGE_SECONDS):
+    """
+    Delete stored results older than `max_age` seconds.
+
+    Pending markers of running jobs are kept much longer, so a slow job's
+    status page does not turn into a 404 while it is still working.
+    """
+    results_dir = os.path.join(upload_folder, RESULTS_DIR_NAME)
+    if not os.path.isdir(results_dir):
+        return
+
+    now = time.time()
+    for name in os.listdir(results_dir):
+        path = os.path.join(results_dir, name)
+        age = PENDING_MAX_AGE_SECONDS if name.endswith(PENDING_SUFFIX) else max_age
+        try:
+            if os.path.getmtime(path) < now - age:
+                os.remove(path)
+        except OSError:
+            # Already removed by a concurrent sweep
+            pass
+
+
+def save_result(upload_folder, result, result_id=None):
+    """
+    Persist a computed result (compare or search) for later export.
+
+    Args:
+        upload_folder: Base upload folder
+        result: Picklable result payload (usually a dict of record lists)
+        result_id: Id to store under (e.g. a background job id); a new
+            one is generated when omitted
+
+    Returns:
+        Result id to pass back to `load_result`
+    """
+    sweep_results(upload_folder)
+
+    result_id = result_id or str(uuid.uuid4())
+    path = _result_path(upload_folder, result_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Write then rename so readers never see a half-written file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+    try:
+        os.remove(_result_path(upload_folder, result_id, PENDING_SUFFIX))
+    except FileNotFoundError:
+        pass
+    return result_id
+
+
+def mark_pending(upload_folder, result_id):
+    """
+    Record that a result is being computed under `result_id`.
+
+    `load_result` reports {'kind': 'pending'} for the id until
+    `save_result` stores the real result.
+    """
+    path = _result_path(upload_folder, result_id, PENDING_SUFFIX)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+
+
+def load_result(upload_folder, result_id):
+    """
+    Load a result stored with `save_result`.
+
+    Returns:
+        The stored payload, {'kind': 'pending'} while it is still being
+        computed, or None if the id is invalid or has expired
+    """
+    if not result_id:
+        return None
+    try:
+        path = _result_path(upload_folder, result_id)
+    except ValueError:
+        return None
+    if not os.path.exists(path):
+        if os.path.exists(_result_path(upload_folder, result_id, PENDING_SUFFIX)):
+            return {'kind': 'pending'}
+        return None
+
+    with open(path, 'rb') as f:
+        return pickle.load(f)
@@ -1,5 +1,27 @@
+import re
+import sys
 import pandas as pd
+from bisect import bisect_left, bisect_right
 from difflib import SequenceMatcher
+from functools import lru_cache
+
+
+__all__ = [
+    'normalize_title_for_key',
+    'normalize_titles',
+    'generate_key',
+    'generate_keys',
+    'fuzzy_match_pass',
+    'calculate_match_confidence',
+    'robust_title_match',
+    'compare_datasets',
+]
+
+
+# Compiled once; shared by the scalar and vectorized title normalization
+_ARTICLE_PREFIX_RE = re.compile(r'^(?:the|a|an) ')
+# \w minus "_" is exactly str.isalnum()
+_NON_ALNUM_RE = re.compile(r'[\W_]+')
 
 
 def normalize_title_for_key(title):
@@ -20,21 +42,50 @@ def normalize_title_for_key(title):
     if not isinstance(title, str):
         return ""
     
+    return _normalize_title_cached(title)
+
+
+@lru_cache(maxsize=100_000)
+def _normalize_title_cached(title):
     # Convert to lowercase and strip whitespace
     title_lower = title.lower().strip()
     
     # Remove common article prefixes (English)
     # This fixes the issue where "The Impact of AI" vs "Impact of AI" wouldn't match
-    article_prefixes = ['the ', 'a ', 'an ']
-    for prefix in article_prefixes:
-        if title_lower.startswith(prefix):
-            title_lower = title_lower[len(prefix):]
-            break
+    title_lower = _ARTICLE_PREFIX_RE.sub('', title_lower, count=1)
     
     # Remove all non-alphanumeric characters
-    title_clean = ''.join(c for c in title_lower if c.isalnum())
+    return _NON_ALNUM_RE.sub('', title_lower)
+
+
+def normalize_titles(titles):
+    """
+    Vectorized `normalize_title_for_key` for a whole Series of titles.
     
-    return title_clean
+    Gives exactly the same result per element, but runs the lowercase,
+    article-prefix and non-alphanumeric steps as pandas string operations
+    instead of one Python call per title.
+    
+    Args:
+        titles: Series of titles (non-string values normalize to "")
+        
+    Returns:
+        Series of normalized title strings with the same index
+    """
+    titles = pd.Series(titles, dtype=object)
+    normalized = pd.Series("", index=titles.index, dtype=object)
+    
+    is_str = titles.map(lambda t: isinstance(t, str)).astype(bool)
+    if is_str.any():
+        normalized[is_str] = (
+            titles[is_str]
+            .str.lower()
+            .str.strip()
+            .str.replace(_ARTICLE_PREFIX_RE, '', n=1, regex=True)
+            .str.replace(_NON_ALNUM_RE, '', regex=True)
+        )
+    
+    return normalized
 
 
 def generate_key(row):
@@ -57,19 +108,24 @@ def generate_key(row):
     Returns:
         Tuple of (doi_key, title_year_key) - either can be None
     """
-    # Generate DOI key if available
     doi = row.get('doi') or row.get('do')
-    doi_key = None
-    if pd.notna(doi) and str(doi).strip():
-        doi_key = f"DOI:{str(doi).strip().lower()}"
-    
-    # Always generate Title + Year key as fallback
     title = row.get('title') or row.get('primary_title') or row.get('ti') or ""
     year = row.get('year') or row.get('py') or ""
     
     # Use improved normalization (removes article prefixes)
-    title_norm = normalize_title_for_key(title)
+    return _make_keys(doi, normalize_title_for_key(title), year)
+
+
+def _make_keys(doi, title_norm, year):
+    """
+    Build the (doi_key, title_year_key) tuple from already-resolved fields.
+    """
+    # Generate DOI key if available
+    doi_key = None
+    if pd.notna(doi) and str(doi).strip():
+        doi_key = sys.intern(f"DOI:{str(doi).strip().lower()}")
     
+    # Always generate Title + Year key as fallback
     # Validate year exists - prevents false matches for papers without years
     if pd.notna(year) and str(year).strip():
         year_str = str(year)[:4]
@@ -78,11 +134,110 @@ def generate_key(row):
         # Papers with same title but no year won't match unless same length
         year_str = f"NOYEAR_{len(title_norm)}"
     
-    title_year_key = f"TY:{title_norm}_{year_str}"
+    # Interned: duplicate references share one key string, and dict lookups
+    # on the key indexes can short-circuit on identity
+    title_year_key = sys.intern(f"TY:{title_norm}_{year_str}")
     
     return (doi_key, title_year_key)
 
 
+def _first_truthy(df, columns, default):
+    """
+    Per row, the first truthy value among `columns` (like `a or b or default`).
+    
+    Missing columns behave like row.get() returning None.
+    """
+    values = [default] * len(df)
+    for col in reversed(columns):
+        if col in df.columns:
+            values = [v or fallback for v, fallback in zip(df[col].to_numpy(dtype=object), values)]
+    return values
+
+
+def generate_keys(df):
+    """
+    Generate matching keys for every reference in a DataFrame.
+    
+    Same result as `df.apply(generate_key, axis=1)`, but reads each column
+    once as an object array instead of building a Series per row, and
+    normalizes all titles in one vectorized call.
+    
+    Args:
+        df: DataFrame of references
+        
+    Returns:
+        List of (doi_key, title_year_key) tuples in row order
+    """
+    dois = _first_truthy(df, ['doi', 'do'], None)
+    titles = _first_truthy(df, ['title', 'primary_title', 'ti'], "")
+    years = _first_truthy(df, ['year', 'py'], "")
+    title_norms = normalize_titles(titles).tolist()
+    
+    return [_make_keys(doi, title_norm, year)
+            for doi, title_norm, year in zip(dois, title_norms, years)]
+
+
+def _length_bounds(length, threshold):
+    """
+    Range of title lengths that can reach `threshold` against a title of `length`.
+    
+    SequenceMatcher.ratio() is 2*M / (len_a + len_b) with M <= min(len_a, len_b),
+    so titles whose lengths differ too much can never be similar enough and
+    need not be compared at all. A small epsilon keeps the bounds inclusive
+    despite float rounding.
+    """
+    if threshold <= 0:
+        return 0, float('inf')
+    return (length * threshold / (2 - threshold) - 1e-9,
+            length * (2 - threshold) / threshold + 1e-9)
+
+
+def _clean_year(item):
+    """
+    First four characters of an item's year ("" when missing or NaN).
+    """
+    year = item.get('year') or item.get('py') or ""
+    if year and not pd.isna(year):
+        return str(year)[:4]
+    return ""
+
+
+def _year_block(year_clean):
+    """
+    Blocking key for a cleaned year: None when missing, the int year when it
+    parses, otherwise the raw string (which can only match itself).
+    """
+    if not year_clean:
+        return None
+    try:
+        return int(year_clean)
+    except ValueError:
+        return year_clean
+
+
+# ratio() scores of normalized title pairs that got past quick_ratio(), kept
+# across calls. A score depends only on the two titles, so re-running a
+# comparison (e.g. after a file gained new references) only pays the full
+# ratio() for pairs it has not scored before. Cleared when full.
+_RATIO_CACHE_MAX = 200_000
+_ratio_cache = {}
+
+
+def _cached_ratio(matcher, title_a_norm, title_b_norm):
+    """
+    matcher.ratio() for a matcher set up on (title_a_norm, title_b_norm),
+    looked up in `_ratio_cache` first.
+    """
+    pair = (title_a_norm, title_b_norm)
+    similarity = _ratio_cache.get(pair)
+    if similarity is None:
+        similarity = matcher.ratio()
+        if len(_ratio_cache) >= _RATIO_CACHE_MAX:
+            _ratio_cache.clear()
+        _ratio_cache[pair] = similarity
+    return similarity
+
+
 def fuzzy_match_pass(unique_a, unique_b, threshold=0.90, year_tolerance=1):
     """
     Perform fuzzy matching on previously unmatched items.
@@ -114,32 +269,82 @@ def fuzzy_match_pass(unique_a, unique_b, threshold=0.90, year_tolerance=1):
     matched_a_indices = set()
     matched_b_indices = set()
     
+    # Normalize all titles once, in bulk, instead of once per (A, B) pair
+    norm_a = normalize_titles([item.get('title') or item.get('ti') or "" for item in unique_a]).tolist()
+    norm_b = normalize_titles([item.get('title') or item.get('ti') or "" for item in unique_b]).tolist()
+    
+    # Clean and parse years once per item instead of once per (A, B) pair
+    years_a = [_clean_year(item) for item in unique_a]
+    years_b = [_clean_year(item) for item in unique_b]
+    year_blocks_a = [_year_block(year) for year in years_a]
+    year_blocks_b = [_year_block(year) for year in years_b]
+    
+    # Block B titles by year, then sort each block by title length. An A title
+    # is only compared with blocks whose year could pass the year checks
+    # below, and within a block only with titles whose length allows a
+    # ratio >= threshold (see _length_bounds). Both filters are exact.
+    blocks = {}
+    for j, title in enumerate(norm_b):
+        if title:
+            blocks.setdefault(year_blocks_b[j], []).append((len(title), j))
+    for block in blocks.values():
+        block.sort()
+    block_lengths = {key: [length for length, _ in block] for key, block in blocks.items()}
+    year_offsets = range(-max(year_tolerance, 0), max(year_tolerance, 0) + 1)
+    
+    # One SequenceMatcher per B title, created on first use. SequenceMatcher
+    # indexes its second sequence (b2j, and the counts behind quick_ratio),
+    # so keeping B as seq2 and only swapping seq1 reuses that work across
+    # every A title scored against it.
+    matchers_b = {}
+    
     for i, item_a in enumerate(unique_a):
         title_a = item_a.get('title') or item_a.get('ti') or ""
-        year_a = item_a.get('year') or item_a.get('py') or ""
         
         if not title_a:
             continue
         
-        title_a_norm = normalize_title_for_key(title_a)
+        title_a_norm = norm_a[i]
+        if not title_a_norm:
+            continue
+        
+        # Missing years may match anything (given a very high similarity);
+        # parsed years only within year_tolerance; unparseable years only
+        # the identical string
+        block_a = year_blocks_a[i]
+        if block_a is None:
+            candidate_blocks = list(blocks)
+        elif isinstance(block_a, int):
+            candidate_blocks = [None] + [block_a + offset for offset in year_offsets]
+        else:
+            candidate_blocks = [None, block_a]
         
-        for j, item_b in enumerate(unique_b):
+        min_len, max_len = _length_bounds(len(title_a_norm), threshold)
+        candidates = []
+        for key in candidate_blocks:
+            if key in blocks:
+                lengths = block_lengths[key]
+                in_band = blocks[key][bisect_left(lengths, min_len):bisect_right(lengths, max_len)]
+                candidates.extend(j for _, j in in_band)
+        
+        # Visit candidates in original order so the first match still wins
+        for j in sorted(candidates):
             if j in matched_b_indices:
                 continue
             
-            title_b = item_b.get('title') or item_b.get('ti') or ""
-            year_b = item_b.get('year') or item_b.get('py') or ""
+            item_b = unique_b[j]
+            title_b_norm = norm_b[j]
             
-            if not title_b:
+            # Calculate similarity using SequenceMatcher. quick_ratio() is a
+            # cheap upper bound on ratio(), so most non-matches are rejected
+            # before the full matching-blocks computation.
+            matcher = matchers_b.get(j)
+            if matcher is None:
+                matcher = matchers_b[j] = SequenceMatcher(None, "", title_b_norm)
+            matcher.set_seq1(title_a_norm)
+            if matcher.quick_ratio() < threshold:
                 continue
-            
-            title_b_norm = normalize_title_for_key(title_b)
-            
-            if not title_a_norm or not title_b_norm:
-                continue
-            
-            # Calculate similarity using SequenceMatcher
-            similarity = SequenceMatcher(None, title_a_norm, title_b_norm).ratio()
+            similarity = _cached_ratio(matcher, title_a_norm, title_b_norm)
             
             # Check if titles meet threshold
             if similarity < threshold:
@@ -151,21 +356,14 @@ def fuzzy_match_pass(unique_a, unique_b, threshold=0.90, year_tolerance=1):
             # BUG FIX: Properly handle pandas NaN values
             # This catches same publication with different year metadata
             
-            # Extract and clean years, handling NaN/None properly
-            import pandas as pd
-            year_a_clean = ""
-            year_b_clean = ""
-            
-            if year_a and not (pd.isna(year_a) if pd else False):
-                year_a_clean = str(year_a)[:4]
-            
-            if year_b and not (pd.isna(year_b) if pd else False):
-                year_b_clean = str(year_b)[:4]
+            # Years were cleaned up front, handling NaN/None properly
+            year_a_clean = years_a[i]
+            year_b_clean = years_b[j]
             
             # Case 1: Both have years
             if year_a_clean and year_b_clean:
-                try:
-                    year_diff = abs(int(year_a_clean) - int(year_b_clean))
+                if isinstance(block_a, int) and isinstance(year_blocks_b[j], int):
+                    year_diff = abs(block_a - year_blocks_b[j])
                     
                     # For very high similarity (>95%), allow year tolerance
                     if similarity >= 0.95:
@@ -174,10 +372,9 @@ def fuzzy_match_pass(unique_a, unique_b, threshold=0.90, year_tolerance=1):
                     # For standard similarity, require exact year match
                     elif year_diff > 0:
                         continue
-                except ValueError:
-                    # If year parsing fails, require exact string match
-                    if year_a_clean != year_b_clean:
-                        continue
+                # If year parsing failed, require exact string match
+                elif year_a_clean != year_b_clean:
+                    continue
             
             # Case 2: One or both missing year
             elif year_a_clean != year_b_clean:
@@ -232,9 +429,11 @@ def calculate_match_confidence(item_a, item_b):
     if title_a == title_b and year_a == year_b and year_a:
         return 0.95, "Exact title+year match"
     
-    # Fuzzy title match
-    if title_a and title_b:
-        similarity = SequenceMatcher(None, title_a, title_b).ratio()
+    # Fuzzy title match (skipped when even the quick_ratio() upper bound
+    # is below the lowest band)
+    if title_a and title_b and year_a == year_b:
+        matcher = SequenceMatcher(None, title_a, title_b)
+        similarity = matcher.ratio() if matcher.quick_ratio() >= 0.85 else 0.0
         
         if similarity >= 0.95 and year_a == year_b:
             return 0.90, f"High similarity ({similarity:.2f})"
@@ -269,8 +468,25 @@ def robust_title_match(title1, title2):
     if t1 == t2:
         return True
     
-    # Fuzzy match for slight variations
-    return SequenceMatcher(None, t1, t2).ratio() > 0.9
+    # Fuzzy match for slight variations; the cheap upper bounds
+    # real_quick_ratio() >= quick_ratio() >= ratio() reject most pairs early
+    matcher = SequenceMatcher(None, t1, t2)
+    return (matcher.real_quick_ratio() > 0.9
+            and matcher.quick_ratio() > 0.9
+            and matcher.ratio() > 0.9)
+
+
+def _index_by_key(keys):
+    """
+    Map every non-empty DOI and Title+Year key to the row indices that have it.
+    """
+    index_by_key = {}
+    for idx, (doi_key, title_year_key) in enumerate(keys):
+        if doi_key:
+            index_by_key.setdefault(doi_key, []).append(idx)
+        if title_year_key:
+            index_by_key.setdefault(title_year_key, []).append(idx)
+    return index_by_key
 
 
 def compare_datasets(df_a, df_b, use_fuzzy=True):
@@ -294,7 +510,7 @@ def compare_datasets(df_a, df_b, use_fuzzy=True):
     2. Match on EITHER DOI key OR title+year key (hybrid matching)
     3. Perform set operations to find overlap and unique items
     4. Apply fuzzy matching to unmatched items (optional)
-    5. Return results with temp keys cleaned up
+    5. Return results as lists of record dicts
     
     Args:
         df_a: DataFrame of references from source A
@@ -312,57 +528,36 @@ def compare_datasets(df_a, df_b, use_fuzzy=True):
         return [], df_a.to_dict('records'), []
 
     # Step 1: Generate hybrid keys (doi_key, title_year_key) for all references
-    df_a['temp_keys'] = df_a.apply(generate_key, axis=1)
-    df_b['temp_keys'] = df_b.apply(generate_key, axis=1)
+    keys_a = generate_keys(df_a)
+    keys_b = generate_keys(df_b)
 
     # Step 2: Build lookup dictionaries for hybrid matching
     # For each reference, create entries for both DOI and Title+Year keys
-    index_a_by_key = {}  # key -> list of indices in df_a
-    index_b_by_key = {}  # key -> list of indices in df_b
-    
-    for idx, keys in enumerate(df_a['temp_keys']):
-        doi_key, title_year_key = keys
-        if doi_key:
-            if doi_key not in index_a_by_key:
-                index_a_by_key[doi_key] = []
-            index_a_by_key[doi_key].append(idx)
-        if title_year_key:
-            if title_year_key not in index_a_by_key:
-                index_a_by_key[title_year_key] = []
-            index_a_by_key[title_year_key].append(idx)
-    
-    for idx, keys in enumerate(df_b['temp_keys']):
-        doi_key, title_year_key = keys
-        if doi_key:
-            if doi_key not in index_b_by_key:
-                index_b_by_key[doi_key] = []
-            index_b_by_key[doi_key].append(idx)
-        if title_year_key:
-            if title_year_key not in index_b_by_key:
-                index_b_by_key[title_year_key] = []
-            index_b_by_key[title_year_key].append(idx)
+    index_a_by_key = _index_by_key(keys_a)  # key -> list of indices in df_a
+    index_b_by_key = _index_by_key(keys_b)  # key -> list of indices in df_b
     
     # Step 3: Find overlaps - match on ANY common key (DOI or Title+Year)
-    all_keys_a = set(index_a_by_key.keys())
-    all_keys_b = set(index_b_by_key.keys())
-    overlap_keys = all_keys_a.intersection(all_keys_b)
-    
-    # Collect matched indices
+    # Probe the larger index with the smaller one's keys instead of building
+    # and intersecting two key sets
     matched_indices_a = set()
     matched_indices_b = set()
     
-    for key in overlap_keys:
-        if key in index_a_by_key:
+    smaller, larger = index_a_by_key, index_b_by_key
+    if len(smaller) > len(larger):
+        smaller, larger = larger, smaller
+    for key in smaller:
+        if key in larger:
             matched_indices_a.update(index_a_by_key[key])
-        if key in index_b_by_key:
             matched_indices_b.update(index_b_by_key[key])
     
     # Step 4: Extract records
-    overlap = df_a.iloc[list(matched_indices_a)].to_dict('records')
-    unique_a_indices = [i for i in range(len(df_a)) if i not in matched_indices_a]
-    unique_b_indices = [i for i in range(len(df_b)) if i not in matched_indices_b]
-    unique_a = df_a.iloc[unique_a_indices].to_dict('records')
-    unique_b = df_b.iloc[unique_b_indices].to_dict('records')
+    # Convert each DataFrame once and pick rows from the record lists,
+    # instead of copying row subsets with iloc before converting them
+    records_a = df_a.to_dict('records')
+    records_b = df_b.to_dict('records')
+    overlap = [records_a[i] for i in matched_indices_a]
+    unique_a = [record for i, record in enumerate(records_a) if i not in matched_indices_a]
+    unique_b = [record for j, record in enumerate(records_b) if j not in matched_indices_b]
 
     # Step 5: Fuzzy matching pass (catches typos and year variations)
     if use_fuzzy and unique_a and unique_b:
@@ -374,8 +569,4 @@ def compare_datasets(df_a, df_b, use_fuzzy=True):
             item_a['fuzzy_match'] = True
             overlap.append(item_a)
 
-    # Cleanup temp column from result dicts
-    for rec in overlap + unique_a + unique_b:
-        rec.pop('temp_keys', None)
-
     return overlap, unique_a, unique_b
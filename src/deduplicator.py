@@ -6,7 +6,7 @@ each reference appears in and which duplicates were removed.
 """
 
 import pandas as pd
-from src.comparator import generate_key, normalize_title_for_key
+from src.comparator import generate_keys, normalize_title_for_key
 
 
 def deduplicate_multiple_files(file_data_list):
@@ -23,62 +23,51 @@ def deduplicate_multiple_files(file_data_list):
     if not file_data_list:
         return [], []
     
-    # Track all references with their source files
-    all_refs = []
+    # Tag, key and group every reference in a single pass over all files.
+    # Each file is converted with its own to_dict() rather than one
+    # pd.concat(): concat would add NaN for columns other files lack, and a
+    # NaN title/year is truthy, breaking the title/ti and year/py fallbacks.
+    key_to_refs = {}
     
     for filename, df in file_data_list:
         if df.empty:
             continue
-            
-        # Add source filename to each reference
-        refs = df.to_dict('records')
-        for ref in refs:
-            ref['source_file'] = filename
-            ref['match_key'] = generate_key(pd.Series(ref))
         
-        all_refs.extend(refs)
+        # Keys come from the file's column arrays, not a pd.Series per record
+        for ref, key in zip(df.to_dict('records'), generate_keys(df)):
+            ref['source_file'] = filename
+            key_to_refs.setdefault(key, []).append(ref)
     
-    if not all_refs:
+    if not key_to_refs:
         return [], []
     
-    # Group by match key to find duplicates
-    key_to_refs = {}
-    for ref in all_refs:
-        key = ref['match_key']
-        if key not in key_to_refs:
-            key_to_refs[key] = []
-        key_to_refs[key].append(ref)
-    
     # Separate unique and duplicate references
     unique_refs = []
     duplicates = []
     
+    # The records are fresh dicts from to_dict() that nothing else holds, so
+    # they are annotated in place rather than copied
     for key, refs in key_to_refs.items():
+        master_ref = refs[0]
         if len(refs) == 1:
             # Unique reference (appears in only one file)
-            ref = refs[0].copy()
-            ref['appears_in'] = [ref['source_file']]
-            ref['occurrence_count'] = 1
-            unique_refs.append(ref)
+            master_ref['appears_in'] = [master_ref['source_file']]
+            master_ref['occurrence_count'] = 1
+            unique_refs.append(master_ref)
         else:
             # Duplicate reference (appears in multiple files)
             # Keep the first occurrence as the "master"
-            master_ref = refs[0].copy()
-            master_ref['appears_in'] = [r['source_file'] for r in refs]
+            sources = [r['source_file'] for r in refs]
+            master_ref['appears_in'] = sources
             master_ref['occurrence_count'] = len(refs)
             unique_refs.append(master_ref)
             
             # Track removed duplicates (all occurrences after the first)
-            for ref in refs[1:]:
-                dup_ref = ref.copy()
-                dup_ref['duplicate_of'] = refs[0]['source_file']
-                dup_ref['all_sources'] = [r['source_file'] for r in refs]
+            for dup_ref in refs[1:]:
+                dup_ref['duplicate_of'] = master_ref['source_file']
+                dup_ref['all_sources'] = list(sources)
                 duplicates.append(dup_ref)
     
-    # Clean up match_key from results
-    for ref in unique_refs + duplicates:
-        ref.pop('match_key', None)
-    
     # Sort results - convert year to string to avoid TypeError with mixed types
     unique_refs.sort(key=lambda x: (
         str(x.get('year') or x.get('py') or '0000'),
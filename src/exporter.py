@@ -1,11 +1,17 @@
 
-def export_to_ris_string(records):
-    """
-    Converts a list of reference dictionaries back to a RIS formatted string.
+def export_to_ris_iter(records):
     """
-    lines = []
+    Yield a RIS formatted string chunk per reference dictionary.
     
-    for record in records:
+    Concatenating the chunks gives exactly `export_to_ris_string(records)`,
+    so routes can stream an export without building it in memory.
+    
+    Only the RIS fields below are read, so extra keys such as deduplication
+    or search metadata never reach the output and need not be stripped.
+    """
+    for i, record in enumerate(records):
+        lines = []
+        
         # Default to JOUR if unknown
         rtype = record.get('type_of_reference', 'JOUR')
         if isinstance(rtype, float): rtype = 'JOUR'
@@ -51,4 +57,12 @@ def export_to_ris_string(records):
         # End Record
         lines.append("ER  - \n")
         
-    return "\n".join(lines)
+        chunk = "\n".join(lines)
+        yield chunk if i == 0 else "\n" + chunk
+
+
+def export_to_ris_string(records):
+    """
+    Converts a list of reference dictionaries back to a RIS formatted string.
+    """
+    return "".join(export_to_ris_iter(records))
@@ -1,5 +1,27 @@
 import pandas as pd
 import io
+import mmap
+import os
+import sys
+
+# RIS tags copied into a friendlier field name (last occurrence wins)
+_FIELD_ALIAS = {
+    'TI': 'title', 'T1': 'title',
+    'PY': 'year', 'Y1': 'year',
+    'JO': 'journal_name', 'T2': 'journal_name',
+    'DO': 'doi',
+    'TY': 'type_of_reference',
+    'AB': 'abstract', 'N2': 'abstract',
+}
+
+# Raw (lowercased) tags whose continuation lines also extend the mapped field
+_CONTINUATION_ALIAS = {
+    'ti': 'title', 't1': 'title',
+    'ab': 'abstract', 'n2': 'abstract',
+    'py': 'year', 'y1': 'year',
+    'jo': 'journal_name', 't2': 'journal_name',
+    'do': 'doi'
+}
 
 def parse_ris_lines(lines):
     entries = []
@@ -18,10 +40,14 @@ def parse_ris_lines(lines):
             last_tag = None
             continue
         
-        # Check for standard RIS tag format: "XX  - "
-        if len(line) >= 6 and line[2] == ' ' and line[3] == ' ' and line[4] == '-' and line[5] == ' ':
+        # Check for standard RIS tag format: "XX  - " (one slice compare)
+        if line[2:6] == '  - ':
             tag = line[:2]
             value = line[6:].strip()
+            if tag == 'AU' or tag == 'A1':
+                # Author names repeat across records and files; keep one
+                # copy of each (shared by the raw tag and 'authors')
+                value = sys.intern(value)
             
             # Standard mapping (simplified)
             # We keep raw tags too for fallback
@@ -37,25 +63,12 @@ def parse_ris_lines(lines):
                 current_entry[key] = value
                 
             # Map common fields for easier usage
-            if tag == 'TI' or tag == 'T1':
-                current_entry['title'] = value
-            elif tag == 'PY' or tag == 'Y1':
-                 current_entry['year'] = value
-            elif tag == 'AU' or tag == 'A1':
-                if 'authors' not in current_entry:
-                    current_entry['authors'] = []
-                # Ensure authors is strictly a list
-                if isinstance(current_entry['authors'], str):
-                     current_entry['authors'] = [current_entry['authors']]
-                current_entry['authors'].append(value)
-            elif tag == 'JO' or tag == 'T2':
-                current_entry['journal_name'] = value
-            elif tag == 'DO':
-                current_entry['doi'] = value
-            elif tag == 'TY':
-                current_entry['type_of_reference'] = value
-            elif tag == 'AB' or tag == 'N2':
-                current_entry['abstract'] = value
+            if tag == 'AU' or tag == 'A1':
+                current_entry.setdefault('authors', []).append(value)
+            else:
+                alias = _FIELD_ALIAS.get(tag)
+                if alias:
+                    current_entry[alias] = value
                 
             last_tag = key
         else:
@@ -69,52 +82,108 @@ def parse_ris_lines(lines):
                     current_entry[last_tag] += " " + line
                 
                 # Also update corresponding mapped fields if they exist
-                # Define mapping from raw tags to mapped field names
-                tag_map = {
-                    'ti': 'title', 't1': 'title',
-                    'ab': 'abstract', 'n2': 'abstract',
-                    'py': 'year', 'y1': 'year',
-                    'jo': 'journal_name', 't2': 'journal_name',
-                    'do': 'doi'
-                }
-                
-                if last_tag in tag_map:
-                    mapped_field = tag_map[last_tag]
-                    if mapped_field in current_entry:
-                        # Append to the mapped field too
-                        if isinstance(current_entry[mapped_field], list):
-                             # This shouldn't happen for title/abstract but good for safety
-                            current_entry[mapped_field][-1] += " " + line
-                        else:
-                            current_entry[mapped_field] += " " + line
+                mapped_field = _CONTINUATION_ALIAS.get(last_tag)
+                if mapped_field and mapped_field in current_entry:
+                    # Append to the mapped field too
+                    if isinstance(current_entry[mapped_field], list):
+                        # This shouldn't happen for title/abstract but good for safety
+                        current_entry[mapped_field][-1] += " " + line
+                    else:
+                        current_entry[mapped_field] += " " + line
 
     if current_entry:
         entries.append(current_entry)
         
     return entries
 
+def _split_lines(text_lines):
+    """
+    Re-split lines from a text stream with str.splitlines().
+    
+    File iteration only breaks on newlines, so each line is split again to
+    honour every boundary a full-text splitlines() would see (e.g. a lone
+    \r). Lines are produced lazily, one at a time.
+    """
+    for raw in text_lines:
+        yield from raw.splitlines()
+
+def _decoded_lines(binary_lines, encoding, errors):
+    """
+    Decode binary lines one at a time instead of decoding the whole buffer.
+    """
+    return _split_lines(raw.decode(encoding, errors) for raw in binary_lines)
+
 def parse_ris_file(file_stream):
     """
     Parse a RIS file and return a list of dictionaries.
+    
+    Accepts RIS text, bytes/memoryview/mmap, a path object, or an open
+    text or binary file (read lazily from its current position). Only a
+    plain string is split up front; every other input is consumed line by
+    line, so no decoded copy of the whole file is materialized.
     """
+    if isinstance(file_stream, os.PathLike):
+        return parse_ris_path(file_stream, errors='replace')
+    
     try:
-        if isinstance(file_stream, bytes):
-            content = file_stream.decode('utf-8', errors='replace')
-        elif isinstance(file_stream, io.StringIO):
-             content = file_stream.getvalue()
+        if isinstance(file_stream, mmap.mmap):
+            lines = _decoded_lines(iter(file_stream.readline, b''), 'utf-8', 'replace')
+        elif isinstance(file_stream, (bytes, bytearray, memoryview)):
+            lines = _decoded_lines(io.BytesIO(file_stream), 'utf-8', 'replace')
+        elif isinstance(file_stream, io.TextIOBase):
+            lines = _split_lines(file_stream)
+        elif hasattr(file_stream, 'read'):
+            lines = _decoded_lines(file_stream, 'utf-8', 'replace')
         else:
-            content = str(file_stream) # Fallback if it's already a string
+            lines = str(file_stream).splitlines() # Fallback if it's already a string
             
-        lines = content.splitlines()
         return parse_ris_lines(lines)
     except Exception as e:
         print(f"Error parsing RIS file: {e}")
         return []
 
+def parse_ris_path(path, encoding='utf-8', errors='replace'):
+    """
+    Parse a saved RIS file through a read-only memory map.
+    
+    The file is read straight from the page cache and decoded one line at
+    a time, so neither a bytes nor a str copy of the whole file is made.
+    """
+    try:
+        with open(path, 'rb') as f:
+            # mmap cannot map an empty file
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return parse_ris_lines(_decoded_lines(iter(mm.readline, b''), encoding, errors))
+    except Exception as e:
+        print(f"Error parsing RIS file {path}: {e}")
+        return []
+
+# Mapped fields that are always plain strings and repeat heavily across
+# records; stored as categories so each distinct value is kept only once
+CATEGORY_COLUMNS = ('year', 'journal_name', 'type_of_reference')
+
+# Raw tags behind those fields. They repeat just as heavily but become a
+# list when a record repeats the tag, so they are only stored as categories
+# when every value in the file is a scalar
+RAW_CATEGORY_COLUMNS = ('py', 'y1', 'jo', 't2', 'ty')
+
 def entries_to_df(entries):
     """
     Convert list of RIS entries to a Pandas DataFrame.
     """
     if not entries:
         return pd.DataFrame()
-    return pd.DataFrame(entries)
+    df = pd.DataFrame(entries)
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in RAW_CATEGORY_COLUMNS:
+        if col in df.columns:
+            try:
+                df[col] = df[col].astype('category')
+            except TypeError:
+                # Repeated tag (list value); keep the column as objects
+                pass
+    return df
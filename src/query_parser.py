@@ -15,6 +15,13 @@ import re
 from typing import List, Union, Dict, Any
 
 
+# Bare words that act as operators (matched case-insensitively)
+OPERATORS = frozenset({'AND', 'OR'})
+
+# Quoted phrase, parenthesis, or bare word (see tokenize)
+_TOKEN_RE = re.compile(r'"[^"]*"?|[()]|[^\s()]+')
+
+
 class QuerySyntaxError(Exception):
     """Raised when query syntax is invalid"""
     pass
@@ -62,43 +69,30 @@ def tokenize(query: str) -> List[str]:
         query: Raw query string
         
     Returns:
-        List of tokens
+        List of tokens (operators upper-cased)
     """
     tokens = []
-    i = 0
     query = query.strip()
     
-    while i < len(query):
-        # Skip whitespace
-        if query[i].isspace():
-            i += 1
-            continue
-        
-        # Quoted phrase - capture everything inside quotes
-        if query[i] == '"':
-            j = i + 1
-            while j < len(query) and query[j] != '"':
-                j += 1
-            if j >= len(query):
-                raise QuerySyntaxError(f"Unclosed quote at position {i}")
-            tokens.append(query[i:j+1])  # Include quotes
-            i = j + 1
-            continue
-        
-        # Parentheses
-        if query[i] in '()':
-            tokens.append(query[i])
-            i += 1
-            continue
+    # One regex scan; alternatives are tried in order at each position:
+    # quoted phrase (closing quote optional so an unclosed one can be
+    # reported), parenthesis, or a word/operator up to whitespace or a
+    # parenthesis. Whitespace between tokens is skipped by finditer.
+    for match in _TOKEN_RE.finditer(query):
+        token = match.group()
         
-        # Word or operator
-        j = i
-        while j < len(query) and not query[j].isspace() and query[j] not in '()':
-            j += 1
-        word = query[i:j]
-        if word:
-            tokens.append(word)
-        i = j
+        if token[0] == '"':
+            # Quoted phrase - capture everything inside quotes
+            if len(token) == 1 or token[-1] != '"':
+                raise QuerySyntaxError(f"Unclosed quote at position {match.start()}")
+            tokens.append(token)  # Include quotes
+        elif token in '()':
+            tokens.append(token)
+        else:
+            # Case-fold operators once here so the parser can compare
+            # tokens against 'AND'/'OR' directly
+            upper = token.upper()
+            tokens.append(upper if upper in OPERATORS else token)
     
     return tokens
 
@@ -148,6 +142,13 @@ def parse_query(query: str) -> ASTNode:
     return result
 
 
+def _combine(or_left: ASTNode, and_left: ASTNode) -> ASTNode:
+    # Fold a finished AND chain into the OR chain to its left
+    if or_left is None:
+        return and_left
+    return OperatorNode('OR', or_left, and_left)
+
+
 def parse_expression(tokens: List[str], pos: int) -> tuple[ASTNode, int]:
     """
     Parse expression with operator precedence.
@@ -157,28 +158,10 @@ def parse_expression(tokens: List[str], pos: int) -> tuple[ASTNode, int]:
     2. AND
     3. Terms and parentheses
     
-    Args:
-        tokens: List of tokens
-        pos: Current position in token list
-        
-    Returns:
-        (AST node, new position)
-    """
-    # Parse first term/group
-    left, pos = parse_and_expression(tokens, pos)
-    
-    # Check for OR operator
-    while pos < len(tokens) and tokens[pos].upper() == 'OR':
-        pos += 1  # Skip OR
-        right, pos = parse_and_expression(tokens, pos)
-        left = OperatorNode('OR', left, right)
-    
-    return left, pos
-
-
-def parse_and_expression(tokens: List[str], pos: int) -> tuple[ASTNode, int]:
-    """
-    Parse AND expressions (higher precedence than OR).
+    Iterative rather than recursive descent: each open parenthesis pushes
+    a frame holding its pending OR chain and AND chain, so nesting depth
+    is not limited by the Python call stack. Operators associate to the
+    left, e.g. A OR B OR C is ((A OR B) OR C).
     
     Args:
         tokens: List of tokens
@@ -187,56 +170,99 @@ def parse_and_expression(tokens: List[str], pos: int) -> tuple[ASTNode, int]:
     Returns:
         (AST node, new position)
     """
-    left, pos = parse_primary(tokens, pos)
+    # One [or_left, and_left] frame per open parenthesis, plus the outermost
+    frames = [[None, None]]
     
-    # Check for AND operator
-    while pos < len(tokens) and tokens[pos].upper() == 'AND':
-        pos += 1  # Skip AND
-        right, pos = parse_primary(tokens, pos)
-        left = OperatorNode('AND', left, right)
+    # Repeated terms share one TermNode, keyed by (term, is_phrase)
+    term_nodes = {}
     
-    return left, pos
+    while True:
+        # Parse primary expression (term, phrase, or parenthesized expression)
+        if pos >= len(tokens):
+            raise QuerySyntaxError("Unexpected end of query")
+        
+        token = tokens[pos]
+        
+        # Parenthesized expression
+        if token == '(':
+            pos += 1  # Skip (
+            frames.append([None, None])
+            continue
+        
+        # Closing parenthesis without opening
+        if token == ')':
+            raise QuerySyntaxError("Unexpected closing parenthesis")
+        
+        if token.startswith('"') and token.endswith('"'):
+            # Quoted phrase
+            key = (token[1:-1], True)  # Remove quotes
+        elif token not in OPERATORS:
+            # Regular term (may contain wildcards)
+            key = (token, False)
+        else:
+            raise QuerySyntaxError(f"Unexpected token: {token}")
+        pos += 1
+        
+        node = term_nodes.get(key)
+        if node is None:
+            node = term_nodes[key] = TermNode(*key)
+        
+        while True:
+            # Extend the current AND chain with the finished operand
+            frame = frames[-1]
+            frame[1] = node if frame[1] is None else OperatorNode('AND', frame[1], node)
+            
+            if pos < len(tokens) and tokens[pos] == 'AND':
+                pos += 1  # Skip AND
+                break
+            
+            # AND chain done: fold it into the OR chain
+            frame[0], frame[1] = _combine(frame[0], frame[1]), None
+            
+            if pos < len(tokens) and tokens[pos] == 'OR':
+                pos += 1  # Skip OR
+                break
+            
+            # Expression done
+            node = frames.pop()[0]
+            if not frames:
+                return node, pos
+            
+            # It was parenthesized; the group is an operand of the outer frame
+            if pos >= len(tokens) or tokens[pos] != ')':
+                raise QuerySyntaxError("Missing closing parenthesis")
+            pos += 1  # Skip )
 
 
-def parse_primary(tokens: List[str], pos: int) -> tuple[ASTNode, int]:
+def canonicalize(node: ASTNode, _seen: Dict[Any, ASTNode] = None) -> ASTNode:
     """
-    Parse primary expression (term, phrase, or parenthesized expression).
+    Share identical subtrees of an AST (hash-consing).
+    
+    Structurally equal subtrees, e.g. the two ("A" OR "B") in
+    ("A" OR "B") AND ("A" OR "B" OR "C"), come back as one node instance,
+    so an evaluator can memoize results by node identity.
     
     Args:
-        tokens: List of tokens
-        pos: Current position in token list
+        node: Root of the AST
         
     Returns:
-        (AST node, new position)
+        Root of an equivalent AST with shared subtrees
     """
-    if pos >= len(tokens):
-        raise QuerySyntaxError("Unexpected end of query")
-    
-    token = tokens[pos]
-    
-    # Parenthesized expression
-    if token == '(':
-        pos += 1  # Skip (
-        node, pos = parse_expression(tokens, pos)
-        if pos >= len(tokens) or tokens[pos] != ')':
-            raise QuerySyntaxError("Missing closing parenthesis")
-        pos += 1  # Skip )
-        return node, pos
-    
-    # Closing parenthesis without opening
-    if token == ')':
-        raise QuerySyntaxError("Unexpected closing parenthesis")
-    
-    # Quoted phrase
-    if token.startswith('"') and token.endswith('"'):
-        phrase = token[1:-1]  # Remove quotes
-        return TermNode(phrase, is_phrase=True), pos + 1
+    if _seen is None:
+        _seen = {}
     
-    # Regular term (may contain wildcards)
-    if token.upper() not in ('AND', 'OR'):
-        return TermNode(token, is_phrase=False), pos + 1
+    if isinstance(node, TermNode):
+        key = ('TERM', node.term, node.is_phrase)
+    elif isinstance(node, OperatorNode):
+        left = canonicalize(node.left, _seen)
+        right = canonicalize(node.right, _seen)
+        key = (node.operator, id(left), id(right))
+        if key not in _seen:
+            node = OperatorNode(node.operator, left, right)
+    else:
+        return node
     
-    raise QuerySyntaxError(f"Unexpected token: {token}")
+    return _seen.setdefault(key, node)
 
 
 def validate_query(query: str) -> tuple[bool, str]:
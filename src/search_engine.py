@@ -7,8 +7,9 @@ wildcard matching, and term highlighting.
 
 import re
 import pandas as pd
+from functools import lru_cache
 from typing import List, Dict, Any, Tuple, Set
-from src.query_parser import ASTNode, TermNode, OperatorNode, parse_query
+from src.query_parser import ASTNode, TermNode, OperatorNode, parse_query, canonicalize
 
 
 def wildcard_to_regex(term: str) -> str:
@@ -33,28 +34,23 @@ def wildcard_to_regex(term: str) -> str:
     return pattern
 
 
-def match_term(term: str, text: str, is_phrase: bool = False) -> Tuple[bool, List[str]]:
+@lru_cache(maxsize=8192)
+def _compile_term(term: str, is_phrase: bool = False) -> re.Pattern:
     """
-    Match a term against text with wildcard support.
+    Compile the case-insensitive regex used to match a search term.
+    
+    Cached, so each distinct term is compiled once instead of once per
+    reference and field.
     
     Args:
         term: Search term (may contain wildcards)
-        text: Text to search in
         is_phrase: If True, match exact phrase (but wildcards still work)
         
     Returns:
-        (matched: bool, matched_strings: List[str])
+        Compiled regex pattern
     """
-    if not text or pd.isna(text):
-        return False, []
-    
-    text_str = str(text)
-    
-    # Check if term contains wildcards
-    has_wildcard = '*' in term
-    
     # For both phrases and terms, handle wildcards the same way
-    if has_wildcard:
+    if '*' in term:
         # Convert wildcard to regex pattern
         pattern = wildcard_to_regex(term)
         # Add word boundaries to prevent partial word matches
@@ -63,30 +59,82 @@ def match_term(term: str, text: str, is_phrase: bool = False) -> Tuple[bool, Lis
             pattern = r'\b' + pattern
         if not term.endswith('*'):
             pattern = pattern + r'\b'
-        
-        regex = re.compile(pattern, re.IGNORECASE)
-        matches = regex.findall(text_str)
-        return len(matches) > 0, matches
-    elif is_phrase:
-        # Exact phrase match without wildcards (case insensitive)
-        # Use word boundaries for phrases too
-        pattern = r'\b' + re.escape(term) + r'\b'
-        regex = re.compile(pattern, re.IGNORECASE)
-        matches = regex.findall(text_str)
-        return len(matches) > 0, matches
     else:
-        # Regular term with word boundaries
+        # Exact phrase or regular term with word boundaries
+        # (case insensitive)
         pattern = r'\b' + re.escape(term) + r'\b'
-        regex = re.compile(pattern, re.IGNORECASE)
-        matches = regex.findall(text_str)
-        return len(matches) > 0, matches
+    
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def _collect_terms(node: ASTNode) -> Tuple[Tuple[str, bool], ...]:
+    """
+    Distinct (term, is_phrase) pairs of every TermNode in an AST, in order.
+    """
+    terms = {}
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, TermNode):
+            terms.setdefault((current.term, current.is_phrase), None)
+        elif isinstance(current, OperatorNode):
+            stack.extend((current.right, current.left))
+    return tuple(terms)
+
+
+@lru_cache(maxsize=1024)
+def _compile_any_term(terms: Tuple[Tuple[str, bool], ...]) -> re.Pattern:
+    """
+    One alternation of the patterns of `terms`.
+    
+    It finds a match in a text exactly when at least one of the terms'
+    own patterns would, so a single search over a field rules out every
+    term of the query at once.
+    """
+    return re.compile(
+        '|'.join(f'(?:{_compile_term(term, is_phrase).pattern})' for term, is_phrase in terms),
+        re.IGNORECASE
+    )
+
+
+def match_term(term: str, text: str, is_phrase: bool = False) -> Tuple[bool, List[str]]:
+    """
+    Match a term against text with wildcard support.
+    
+    Args:
+        term: Search term (may contain wildcards)
+        text: Text to search in
+        is_phrase: If True, match exact phrase (but wildcards still work)
+        
+    Returns:
+        (matched: bool, matched_strings: List[str])
+    """
+    # Plain checks instead of pd.isna(), which is slow on scalars and
+    # cannot take list values (repeated tags such as authors)
+    if not text or (isinstance(text, float) and text != text):
+        return False, []
+    
+    matches = _compile_term(term, is_phrase).findall(str(text))
+    return len(matches) > 0, matches
+
+
+
 
 
 
 
+# Map field names to possible column names
+FIELD_COLUMNS = {
+    'title': ['title', 'ti', 'primary_title'],
+    'abstract': ['abstract', 'ab', 'n2'],
+    'keywords': ['keywords', 'kw'],
+    'journal': ['journal_name', 'jo', 't2'],
+    'authors': ['authors', 'au', 'a1']
+}
 
 
-def evaluate_ast(node: ASTNode, reference: Dict[str, Any], fields: List[str]) -> Tuple[bool, Dict[str, Set[str]]]:
+def evaluate_ast(node: ASTNode, reference: Dict[str, Any], fields: List[str],
+                 cache: Dict[int, Any] = None) -> Tuple[bool, Dict[str, Set[str]]]:
     """
     Evaluate AST against a reference with field-specific match tracking.
     
@@ -94,26 +142,58 @@ def evaluate_ast(node: ASTNode, reference: Dict[str, Any], fields: List[str]) ->
         node: AST node to evaluate
         reference: Reference dictionary
         fields: List of fields to search in (e.g., ['title', 'abstract'])
+        cache: Optional per-reference memo keyed by node identity; with a
+            canonicalized AST, repeated subtrees are evaluated only once
         
     Returns:
         (matched: bool, field_matches: Dict[field_name -> Set[matched_terms]])
         field_matches contains ALL matches found, even if the boolean result is False
+        (treat as read-only; memoized results are shared)
+    """
+    return _evaluate(node, reference, resolve_field_columns(fields), cache)
+
+
+def resolve_field_columns(fields: List[str], columns=None) -> List[Tuple[str, List[str]]]:
+    """
+    Pair each field with the column names it is searched in.
+    
+    Args:
+        fields: List of fields to search in (e.g., ['title', 'abstract'])
+        columns: Optional available column names (e.g. df.columns); when
+            given, columns not in it are left out
+        
+    Returns:
+        List of (field, [column names]) in field order
     """
+    resolved = []
+    for field in fields:
+        possible_cols = FIELD_COLUMNS.get(field, [field])
+        if columns is not None:
+            possible_cols = [col for col in possible_cols if col in columns]
+        resolved.append((field, possible_cols))
+    return resolved
+
+
+def _evaluate(node: ASTNode, reference: Dict[str, Any], field_columns: List[Tuple[str, List[str]]],
+              cache: Dict[int, Any]) -> Tuple[bool, Dict[str, Set[str]]]:
+    # evaluate_ast with the fields already resolved to columns
+    if cache is None:
+        return _evaluate_node(node, reference, field_columns, None)
+    
+    key = id(node)
+    if key not in cache:
+        cache[key] = _evaluate_node(node, reference, field_columns, cache)
+    return cache[key]
+
+
+def _evaluate_node(node: ASTNode, reference: Dict[str, Any], field_columns: List[Tuple[str, List[str]]],
+                   cache: Dict[int, Any]) -> Tuple[bool, Dict[str, Set[str]]]:
+    # _evaluate without the memo lookup; children go back through it
     if isinstance(node, TermNode):
         # Leaf node - check if term matches in any selected field
         field_matches = {}
         
-        for field in fields:
-            # Map field names to possible column names
-            field_columns = {
-                'title': ['title', 'ti', 'primary_title'],
-                'abstract': ['abstract', 'ab', 'n2'],
-                'keywords': ['keywords', 'kw'],
-                'journal': ['journal_name', 'jo', 't2'],
-                'authors': ['authors', 'au', 'a1']
-            }
-            
-            possible_cols = field_columns.get(field, [field])
+        for field, possible_cols in field_columns:
             matched_terms = set()
             
             for col in possible_cols:
@@ -132,13 +212,18 @@ def evaluate_ast(node: ASTNode, reference: Dict[str, Any], fields: List[str]) ->
         return len(field_matches) > 0, field_matches
     
     elif isinstance(node, OperatorNode):
-        left_match, left_field_matches = evaluate_ast(node.left, reference, fields)
-        right_match, right_field_matches = evaluate_ast(node.right, reference, fields)
+        left_match, left_field_matches = _evaluate(node.left, reference, field_columns, cache)
+        right_match, right_field_matches = _evaluate(node.right, reference, field_columns, cache)
         
-        # Always merge ALL matches from both sides, regardless of boolean result
-        combined_matches = {}
-        for field in set(left_field_matches.keys()) | set(right_field_matches.keys()):
-            combined_matches[field] = left_field_matches.get(field, set()) | right_field_matches.get(field, set())
+        # Always merge ALL matches from both sides, regardless of boolean result.
+        # Sets only in one side are shared, not copied; results are read-only
+        # (and may be memoized), so neither side is updated in place.
+        combined_matches = dict(left_field_matches)
+        for field, terms in right_field_matches.items():
+            if field in combined_matches:
+                combined_matches[field] = combined_matches[field] | terms
+            else:
+                combined_matches[field] = terms
         
         if node.operator == 'AND':
             # Both must match for boolean result to be True
@@ -155,6 +240,13 @@ def evaluate_ast(node: ASTNode, reference: Dict[str, Any], fields: List[str]) ->
 
 
 
+@lru_cache(maxsize=1024)
+def _compile_highlight(terms: Tuple[str, ...]) -> re.Pattern:
+    # Case-insensitive alternation of the literal terms, shortest first,
+    # inside a lookahead so it is tried at every position of the text
+    return re.compile('(?=(' + '|'.join(re.escape(term) for term in terms) + '))', re.IGNORECASE)
+
+
 def highlight_text(text: str, matched_terms: Set[str]) -> str:
     """
     Highlight matched terms in text using HTML <mark> tags.
@@ -172,65 +264,61 @@ def highlight_text(text: str, matched_terms: Set[str]) -> str:
     if not text or pd.isna(text) or not matched_terms:
         return str(text) if not pd.isna(text) else ""
     
+    terms = {term for term in matched_terms if term}
+    if not terms:
+        return str(text)
+    
     text_str = str(text)
     
-    # Find all match positions with their terms
-    matches = []
-    for term in matched_terms:
-        if not term:
-            continue
-        
-        # Find all occurrences of this term (case insensitive)
-        pattern = re.compile(re.escape(term), re.IGNORECASE)
-        for match in pattern.finditer(text_str):
-            matches.append({
-                'start': match.start(),
-                'end': match.end(),
-                'term': match.group(),  # Use actual matched text (preserves case)
-                'length': match.end() - match.start()
-            })
-    
-    if not matches:
-        return text_str
-    
-    # Sort by start position, then by length (shorter first to maximize count)
-    # Shorter matches allow more room for other matches
-    matches.sort(key=lambda m: (m['start'], m['length']))
-    
-    # Track which positions are already highlighted
-    highlighted_positions = set()
-    selected_matches = []
-    
-    # Greedy algorithm: select matches that don't overlap, prioritizing:
-    # 1. Earlier position (left to right)
-    # 2. Shorter length (to leave room for more matches)
-    for match in matches:
-        positions = set(range(match['start'], match['end']))
-        # Check if this match overlaps with any already selected
-        if not positions.intersection(highlighted_positions):
-            selected_matches.append(match)
-            highlighted_positions.update(positions)
-    
-    # Sort selected matches by position for proper insertion
-    selected_matches.sort(key=lambda m: m['start'])
-    
-    # Build highlighted string by inserting <mark> tags
-    result = []
-    last_pos = 0
+    # Candidate spans in one pass over the text: at every position where
+    # some term starts, the shortest such term. A longer term starting
+    # there ends later, so it can never allow more highlights.
+    pattern = _compile_highlight(tuple(sorted(terms, key=lambda t: (len(t), t))))
+    spans = [(match.start(), match.end(1)) for match in pattern.finditer(text_str)]
     
-    for match in selected_matches:
-        # Add text before this match
-        result.append(text_str[last_pos:match['start']])
-        # Add highlighted match
-        result.append(f"<mark>{match['term']}</mark>")
-        last_pos = match['end']
+    # Maximum number of non-overlapping spans (interval scheduling): keep
+    # taking the span that ends first among those starting after the last
+    # one taken; of spans ending together, the longer one
+    spans.sort(key=lambda span: (span[1], span[0]))
     
-    # Add remaining text
-    result.append(text_str[last_pos:])
+    # Build highlighted string by inserting <mark> tags; the spans taken
+    # come out in text order
+    result = []
+    last_end = 0
+    for start, end in spans:
+        if start >= last_end:
+            result.append(text_str[last_end:start])
+            # Use actual matched text (preserves case)
+            result.append(f"<mark>{text_str[start:end]}</mark>")
+            last_end = end
+    result.append(text_str[last_end:])
     
     return ''.join(result)
 
 
+def _may_match(pattern: re.Pattern, value: Any) -> bool:
+    # False only when match_term could not find anything in `value` either
+    if not value or (isinstance(value, float) and value != value):
+        return False
+    return pattern.search(str(value)) is not None
+
+
+@lru_cache(maxsize=1024)
+def _prepare_query(query: str) -> Tuple[ASTNode, re.Pattern]:
+    """
+    Parse a query once and keep what every search with it needs.
+    
+    Returns:
+        (canonicalized AST, pattern matching wherever any query term would).
+        The AST is shared between searches and must not be modified.
+        
+    Raises:
+        QuerySyntaxError: If query syntax is invalid (not cached)
+    """
+    # Identical subtrees become one node, evaluated once per reference
+    ast = canonicalize(parse_query(query))
+    return ast, _compile_any_term(_collect_terms(ast))
+
 
 def search_references(
     df: pd.DataFrame,
@@ -259,9 +347,9 @@ def search_references(
             'error': None
         }
     
-    # Parse query
+    # Parse query (cached; repeat searches skip parsing and compiling)
     try:
-        ast = parse_query(query)
+        ast, any_term = _prepare_query(query)
     except Exception as e:
         return [], [], {
             'total_refs': len(df),
@@ -277,15 +365,33 @@ def search_references(
     matched_refs = []
     unmatched_refs = []
     
-    for idx, row in df.iterrows():
-        reference = row.to_dict()
+    # Resolve fields to the columns this DataFrame actually has, once per
+    # search rather than per term and row
+    field_columns = resolve_field_columns(fields, set(df.columns))
+    search_cols = list(dict.fromkeys(col for _, cols in field_columns for col in cols))
+    
+    # Scan each search column once, as an array: per row, does any query
+    # term occur in it? Only those columns can contribute matches, and rows
+    # where none does skip AST evaluation entirely.
+    column_hits = {
+        col: [_may_match(any_term, value) for value in df[col].to_numpy(dtype=object)]
+        for col in search_cols
+    }
+    
+    # Convert all rows in one call rather than building a Series per row
+    # with iterrows() and converting each one back to a dict
+    for i, reference in enumerate(df.to_dict('records')):
+        searchable = {col: reference[col] for col, hits in column_hits.items() if hits[i]}
         
         # Evaluate AST - now returns field-specific matches
-        is_match, field_matches = evaluate_ast(ast, reference, fields)
+        if searchable:
+            is_match, field_matches = _evaluate(ast, searchable, field_columns, {})
+        else:
+            is_match, field_matches = False, {}
         
         if is_match:
             # Add highlighting for matched fields
-            ref_copy = reference.copy()
+            ref_copy = reference
             
             # Highlight title if it's a search field AND it has matches
             if 'title' in field_matches:
@@ -310,7 +416,7 @@ def search_references(
             matched_refs.append(ref_copy)
         else:
             # Even for unmatched, apply highlighting for any partial matches
-            ref_copy = reference.copy()
+            ref_copy = reference
             
             # Highlight title if there were any title matches (even if query failed overall)
             if 'title' in field_matches:
@@ -0,0 +1,96 @@
+"""
+Background jobs for compare and deduplication requests.
+
+Parsing and matching large RIS files can take tens of seconds, so the
+upload routes only save the files and submit a job here. Each job stores
+its template context with `save_result` under the job id, which the
+/status/<job_id> page polls for and renders once it is ready.
+
+Job state lives in the result store rather than in this process, so the
+status page works when it is served by a different WSGI worker than the
+one running the job.
+"""
+
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from src.cache import (
+    get_comparison, deduplicate_files_cached, save_result, mark_pending
+)
+from src.deduplicator import get_deduplication_stats
+
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+
+
+def _run_compare(upload_folder, job_id, path_a, path_b, filename_a, filename_b):
+    overlap, unique_a, unique_b, stats = get_comparison(path_a, path_b)
+
+    save_result(upload_folder, {
+        'kind': 'compare',
+        'overlap': overlap,
+        'unique_a': unique_a,
+        'unique_b': unique_b,
+        'stats': stats,
+        'filename_a': filename_a,
+        'filename_b': filename_b
+    }, result_id=job_id)
+
+
+def _run_dedup(upload_folder, job_id, named_paths):
+    unique_refs, duplicates, file_data_list = deduplicate_files_cached(named_paths)
+
+    result = {'kind': 'dedup', 'empty': not file_data_list}
+    if file_data_list:
+        result.update({
+            'unique_refs': unique_refs,
+            'duplicates': duplicates,
+            'stats': get_deduplication_stats(unique_refs, duplicates, file_data_list),
+            'filenames': [filename for filename, _ in file_data_list]
+        })
+
+    save_result(upload_folder, result, result_id=job_id)
+
+
+def _run_job(fn, upload_folder, job_id, *args):
+    try:
+        fn(upload_folder, job_id, *args)
+    except Exception:
+        logger.exception("Background job %s failed", job_id)
+        save_result(upload_folder, {'kind': 'failed'}, result_id=job_id)
+
+
+def _submit(fn, upload_folder, *args):
+    job_id = str(uuid.uuid4())
+    # Mark the job pending before it can finish so polling never sees a gap
+    mark_pending(upload_folder, job_id)
+    executor.submit(_run_job, fn, upload_folder, job_id, *args)
+    return job_id
+
+
+def run_compare(upload_folder, path_a, path_b, filename_a, filename_b):
+    """
+    Queue a comparison of two saved RIS files.
+
+    Returns:
+        Job id; the result is stored under the same id
+    """
+    return _submit(_run_compare, upload_folder, path_a, path_b, filename_a, filename_b)
+
+
+def run_dedup(upload_folder, named_paths):
+    """
+    Queue deduplication of saved RIS files.
+
+    Args:
+        upload_folder: Base upload folder
+        named_paths: List of (display filename, path) tuples
+
+    Returns:
+        Job id; the result is stored under the same id
+    """
+    return _submit(_run_dedup, upload_folder, named_paths)
@@ -0,0 +1,61 @@
+"""
+Test the parse/result cache used by the export and re-query routes.
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.cache import load_df_cached, get_comparison, CACHE_DIR_NAME
+
+SAMPLES = os.path.join(os.path.dirname(__file__))
+
+
+def test_cache():
+    """Parsed files are pickled once and re-used by later comparisons."""
+    workdir = tempfile.mkdtemp()
+    try:
+        path_a = os.path.join(workdir, 'sample_a.ris')
+        path_b = os.path.join(workdir, 'sample_b.ris')
+        shutil.copy(os.path.join(SAMPLES, 'sample_a.ris'), path_a)
+        shutil.copy(os.path.join(SAMPLES, 'sample_b.ris'), path_b)
+
+        df_first = load_df_cached(path_a)
+        cache_files = os.listdir(os.path.join(workdir, CACHE_DIR_NAME))
+        print(f"Cache files after first load: {len(cache_files)}")
+        assert len(cache_files) == 1
+
+        df_second = load_df_cached(path_a)
+        assert df_first.equals(df_second)
+        assert len(os.listdir(os.path.join(workdir, CACHE_DIR_NAME))) == 1
+
+        # Re-uploading the same name must not serve the stale sidecar
+        shutil.copy(os.path.join(SAMPLES, 'sample_b.ris'), path_a)
+        os.utime(path_a)
+        df_reuploaded = load_df_cached(path_a)
+        assert list(df_reuploaded['title']) != list(df_first['title'])
+        assert len(os.listdir(os.path.join(workdir, CACHE_DIR_NAME))) == 1
+        shutil.copy(os.path.join(SAMPLES, 'sample_a.ris'), path_a)
+        os.utime(path_a)
+
+        first = get_comparison(path_a, path_b)
+        cache_mtimes = {name: os.stat(os.path.join(workdir, CACHE_DIR_NAME, name)).st_mtime_ns
+                        for name in os.listdir(os.path.join(workdir, CACHE_DIR_NAME))}
+        second = get_comparison(path_a, path_b)
+        overlap, unique_a, unique_b, stats = first
+        print(f"Overlap: {len(overlap)}, Unique A: {len(unique_a)}, Unique B: {len(unique_b)}")
+        assert (len(overlap), len(unique_a), len(unique_b)) == (2, 1, 1)
+        assert second[3] == stats
+        # The second compare reads both sidecars instead of re-parsing
+        assert len(cache_mtimes) == 2
+        assert all(os.stat(os.path.join(workdir, CACHE_DIR_NAME, name)).st_mtime_ns == mtime
+                   for name, mtime in cache_mtimes.items())
+        print("✓ PASS: cache hit on second load and second compare")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    test_cache()
@@ -7,6 +7,7 @@ Tests:
 3. Missing year handling
 4. Match confidence scoring
 5. Edge cases
+6. Vectorized title normalization
 """
 
 import sys
@@ -17,6 +18,7 @@ from src.parser import parse_ris_file, entries_to_df
 from src.comparator import (
     compare_datasets, 
     normalize_title_for_key,
+    normalize_titles,
     fuzzy_match_pass,
     calculate_match_confidence
 )
@@ -294,6 +296,39 @@ def test_edge_cases():
     return failed == 0
 
 
+def test_vectorized_normalization():
+    """Test that normalize_titles matches normalize_title_for_key per title."""
+    print("\n=== TEST 8: Vectorized Title Normalization ===")
+    
+    titles = [
+        "The Impact of AI",
+        "  A Study on Machine-Learning  ",
+        "An Overview of Deep_Learning",
+        "THE IMPACT OF AI",
+        "Theory of Everything",
+        "the",
+        "Ünïcödé Títle (2024)",
+        "",
+        None,
+        float('nan'),
+        ["list", "title"],
+    ]
+    
+    expected = [normalize_title_for_key(t) for t in titles]
+    actual = normalize_titles(titles).tolist()
+    
+    failed = 0
+    for title, exp, act in zip(titles, expected, actual):
+        if exp == act:
+            print(f"✅ PASS: {title!r} -> '{act}'")
+        else:
+            print(f"❌ FAIL: {title!r} -> '{act}' (expected '{exp}')")
+            failed += 1
+    
+    print(f"\nResults: {len(titles) - failed} passed, {failed} failed")
+    return failed == 0
+
+
 def run_all_tests():
     """Run all tests and report results."""
     print("=" * 70)
@@ -308,6 +343,7 @@ def run_all_tests():
         "Match Confidence": test_match_confidence(),
         "Real Sample Data": test_real_sample_data(),
         "Edge Cases": test_edge_cases(),
+        "Vectorized Normalization": test_vectorized_normalization(),
     }
     
     print("\n" + "=" * 70)
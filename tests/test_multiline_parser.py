@@ -5,6 +5,7 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath('.'))
 
+import io
 from src.parser import parse_ris_file
 
 # Create a sample RIS file with multi-line abstract (using user's example)
@@ -57,3 +58,34 @@ except Exception as e:
 import os
 if os.path.exists('test_multiline.ris'):
     os.remove('test_multiline.ris')
+
+print("\n" + "=" * 70)
+print("TEST: Multi-line Abstract Parsing from a byte stream")
+print("=" * 70)
+
+entries = parse_ris_file(io.BytesIO(ris_content.encode('utf-8')))
+abstract = entries[0].get('abstract', '') if entries else ''
+if "vital to conducting systematic reviews" in abstract and "suitable for ML." in abstract:
+    print("✓ PASS: Streamed abstract contains all continuation lines")
+else:
+    print("✗ FAIL: Streamed abstract is truncated")
+
+print("\n" + "=" * 70)
+print("TEST: Multi-line Abstract Parsing from open file handles")
+print("=" * 70)
+
+with open('test_multiline.ris', 'w', encoding='utf-8') as f:
+    f.write(ris_content)
+
+from pathlib import Path
+with open('test_multiline.ris', 'r', encoding='utf-8') as f:
+    from_text = parse_ris_file(f)
+with open('test_multiline.ris', 'rb') as f:
+    from_binary = parse_ris_file(f)
+from_path = parse_ris_file(Path('test_multiline.ris'))
+os.remove('test_multiline.ris')
+
+if from_text == from_binary == from_path == parse_ris_file(ris_content):
+    print("✓ PASS: Text, binary and path inputs parse the same as the string")
+else:
+    print("✗ FAIL: File handle parsing differs from string parsing")
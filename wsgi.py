@@ -0,0 +1,8 @@
+"""
+WSGI entry point for production servers.
+
+Run with, for example:
+    gunicorn -w $(nproc) -k gthread --threads 4 -b 0.0.0.0:5000 wsgi:app
+"""
+
+from app import app